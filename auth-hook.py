@@ -6,12 +6,19 @@ Uses the provider plugin system.
 Environment variables (set by Certbot):
   - CERTBOT_DOMAIN: The domain being validated
   - CERTBOT_VALIDATION: The validation token
+  - CERTBOT_REMAINING_CHALLENGES: Challenges left after this one
+  - CERTBOT_ALL_DOMAINS: All domains being validated in this run
+
+When Certbot reports remaining challenges, the token is queued in a
+pending-state file and the hook returns immediately. The last call
+creates every queued record in one batch and waits for propagation once.
 
 Environment variables (set by user):
   - DNS_PROVIDER: Provider name (default: digitalocean)
   - {PROVIDER}_API_TOKEN: API token for the provider
 """
 
+import hashlib
 import os
 import sys
 import time
@@ -19,7 +26,63 @@ import time
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from providers import get_provider
+from providers import _json
+from providers._cache import cache_dir
+from providers.hooks import provider_from_env, split_challenge_domain
+
+# Seconds to wait for the TXT record to show up on authoritative servers
+PROPAGATION_TIMEOUT = 120
+
+# Pending challenges older than this are left over from an aborted run
+PENDING_MAX_AGE = 600
+
+
+def _pending_path():
+    """Return the pending-state file for the current certbot run."""
+    run_key = os.environ.get("CERTBOT_ALL_DOMAINS") or os.environ.get("CERTBOT_DOMAIN", "")
+    digest = hashlib.sha256(run_key.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir(), f"pending-{digest}.json")
+
+
+def _load_pending(path):
+    """Load queued challenges, ignoring stale or unreadable state."""
+    try:
+        if time.time() - os.path.getmtime(path) > PENDING_MAX_AGE:
+            return []
+        with open(path, "rb") as f:
+            return _json.loads(f.read())
+    except (OSError, ValueError):
+        return []
+
+
+def _save_pending(path, pending):
+    """Write queued challenges to a file only the current user can read."""
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(_json.dumps(pending))
+
+
+def _deploy_pending(provider, pending):
+    """Create all queued TXT records, one batch per zone, then wait for propagation once."""
+    zones = {}
+    for entry in pending:
+        zones.setdefault(entry["zone"], []).append(entry)
+
+    for zone, entries in zones.items():
+        records = [{"name": e["name"], "value": e["value"], "ttl": 60} for e in entries]
+        created = provider.create_txt_records(zone, records)
+        if not all(created):
+            return False
+
+    print("Waiting for DNS propagation...")
+    for entry in pending:
+        if not provider.wait_for_propagation(entry["zone"], entry["name"], entry["value"],
+                                             timeout=PROPAGATION_TIMEOUT):
+            print("Record not visible on authoritative nameservers, waiting 10 seconds...")
+            time.sleep(10)
+            break
+    return True
 
 
 def main():
@@ -35,36 +98,42 @@ def main():
     print(f"CERTBOT_VALIDATION: {validation}")
     print(f"PROVIDER: {provider_name}")
 
-    # Determine root domain and subdomain
-    parts = domain.split(".")
-    if len(parts) > 2:
-        root_domain = ".".join(parts[-2:])
-        subdomain = ".".join(parts[:-2])
-        record_name = f"_acme-challenge.{subdomain}"
-    else:
-        root_domain = domain
-        subdomain = ""
-        record_name = "_acme-challenge"
+    root_domain, subdomain, record_name = split_challenge_domain(domain)
 
     print(f"ROOT_DOMAIN: {root_domain}")
     print(f"SUBDOMAIN: {subdomain}")
     print(f"RECORD_NAME: {record_name}")
 
     try:
-        provider_class = get_provider(provider_name)
-        api_token = os.environ.get(provider_class.env_token_name)
+        provider = provider_from_env(provider_name)
+        remaining = os.environ.get("CERTBOT_REMAINING_CHALLENGES")
+
+        if remaining is not None:
+            path = _pending_path()
+            pending = _load_pending(path)
+            pending.append({"domain": domain, "zone": root_domain,
+                            "name": record_name, "value": validation})
+            if remaining != "0":
+                _save_pending(path, pending)
+                print(f"Queued TXT record, {remaining} challenge(s) remaining.")
+                return
+
+            if os.path.exists(path):
+                os.remove(path)
+            if not _deploy_pending(provider, pending):
+                print("Failed to create DNS TXT records.")
+                sys.exit(1)
+            return
 
-        if not api_token:
-            print(f"Error: {provider_class.env_token_name} not set")
-            sys.exit(1)
-
-        provider = provider_class(api_token)
         record = provider.create_txt_record(root_domain, record_name, validation, ttl=60)
 
         if record:
-            print(f"DNS TXT record created successfully (ID: {record.get('id')}).")
-            print("Waiting 10 seconds for DNS propagation...")
-            time.sleep(10)
+            print(f"DNS TXT record created successfully (ID: {record.id}).")
+            print("Waiting for DNS propagation...")
+            if not provider.wait_for_propagation(root_domain, record_name, validation,
+                                                 timeout=PROPAGATION_TIMEOUT):
+                print("Record not visible on authoritative nameservers, waiting 10 seconds...")
+                time.sleep(10)
         else:
             print("Failed to create DNS TXT record.")
             sys.exit(1)
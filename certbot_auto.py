@@ -1,15 +1,84 @@
+import contextlib
+import fcntl
+import functools
+import logging
+import mmap
 import os
 import subprocess
 import sys
 import shutil
 import argparse
 import re
-import dns.resolver
-import OpenSSL
-from datetime import datetime
-import glob
+import shlex
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+import threading
+import time
 
-from providers import get_provider, list_providers
+from providers import _json, get_provider, list_providers
+from providers._cache import cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Used with fullmatch(): unlike a trailing "$", it rejects "example.com\n"
+_DOMAIN_RE = re.compile(r'[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z]{2,})+')
+_SUBDOMAIN_RE = re.compile(r'[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?')
+
+# Upper bound in seconds for a single certbot run
+CERTBOT_TIMEOUT = 1800
+
+# Certbot's default config, work and logs directories
+LETSENCRYPT_DIR = "/etc/letsencrypt"
+LETSENCRYPT_WORK_DIR = "/var/lib/letsencrypt"
+LETSENCRYPT_LOGS_DIR = "/var/log/letsencrypt"
+
+# Where certbot keeps the current version of each certificate lineage
+LIVE_DIR = os.path.join(LETSENCRYPT_DIR, "live")
+
+# Files in a lineage; archive/ holds numbered versions, live/ links to the latest
+_LINEAGE_FILES = ("cert", "chain", "fullchain", "privkey")
+_ARCHIVE_VERSION_RE = re.compile(r'cert(\d+)\.pem')
+
+_PEM_END = b"-----END CERTIFICATE-----"
+
+# Certbot appends -0001, -0002, ... when a lineage name is already taken
+_LINEAGE_SUFFIX_RE = re.compile(r'-\d{4}$')
+
+# Certbot locks its config and work directories, so --parallel gives each
+# domain its own staging set under here and merges the result back into
+# LETSENCRYPT_DIR
+PARALLEL_BASE_DIR = "/var/lib/certbot-auto"
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _pick_hook(base):
+    """
+    Build the certbot hook command, preferring the Python hook (works with
+    all providers) and falling back to the shell one.
+
+    The Python hook is run with this interpreter rather than through its
+    shebang or a shell wrapper, so it sees the same installed packages.
+    """
+    path = os.path.join(SCRIPT_DIR, base + ".py")
+    if os.path.exists(path):
+        return shlex.join([sys.executable, path])
+    return os.path.join(SCRIPT_DIR, base + ".sh")
+
+
+_AUTH_HOOK = _pick_hook("auth-hook")
+_CLEANUP_HOOK = _pick_hook("cleanup-hook")
+
+
+def _comma_list(value):
+    """Split a comma-separated CLI value into a list of non-empty items."""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _full_domains(domain, subdomains):
+    """Build full domain names from a root domain and subdomains ("" or "@" for the root)."""
+    return [f"{sub}.{domain}" if sub and sub != "@" else domain
+            for sub in subdomains or [""]]
 
 
 def parse_args():
@@ -19,7 +88,10 @@ def parse_args():
         description="Automated SSL/TLS certificate management with Certbot and DNS providers",
         epilog="Examples:\n"
                "  %(prog)s --action renew --domain example.com --subdomain www\n"
+               "  %(prog)s --action renew --domain example.com --subdomain @,www,mail  # one SAN cert\n"
                "  %(prog)s --action renew --domain example.com  # root domain\n"
+               "  %(prog)s --action renew --domains example.com,www.example.com  # one SAN cert\n"
+               "  %(prog)s --action renew --domains a.example.com,b.example.com --parallel 2\n"
                "  %(prog)s --action revoke --domain www.example.com\n"
                "  %(prog)s --action expiry --domain example.com\n"
                "  %(prog)s --provider cloudflare --action renew --domain example.com\n"
@@ -32,15 +104,24 @@ def parse_args():
                         help="Action to perform: renew, revoke, or expiry check")
     parser.add_argument("--domain", type=str,
                         help="Root domain (e.g., example.com)")
-    parser.add_argument("--subdomain", type=str, default="",
-                        help="Subdomain for certificate (e.g., www, mail). Empty for root domain")
+    parser.add_argument("--subdomain", type=_comma_list, default=[],
+                        help="Subdomain for certificate (e.g., www, mail). Empty for root domain. "
+                             "Comma-separated for one certificate covering several (@ is the root)")
+    parser.add_argument("--domains", type=_comma_list, default=[],
+                        help="Comma-separated full domain names to put on a single certificate "
+                             "(e.g., example.com,www.example.com). Only with --action renew")
+    parser.add_argument("--parallel", type=int, default=1, metavar="N",
+                        help="With --domains, issue a separate certificate per domain using up to "
+                             "N concurrent certbot runs. Default: 1 (one SAN certificate)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore cached results from earlier runs: re-check installed tools and "
+                             "fetch the domain list and DNS records from the provider again")
     return parser.parse_args()
 
 
 def validate_domain(domain):
     """Validate domain format."""
-    pattern = r'^[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(\.[a-zA-Z]{2,})+$'
-    if not re.match(pattern, domain):
+    if not _DOMAIN_RE.fullmatch(domain):
         print(f"Error: Invalid domain format: {domain}")
         sys.exit(1)
     return True
@@ -50,15 +131,46 @@ def validate_subdomain(subdomain):
     """Validate subdomain format."""
     if not subdomain:
         return True
-    pattern = r'^[a-zA-Z0-9]([a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?$'
-    if not re.match(pattern, subdomain):
+    if not _SUBDOMAIN_RE.fullmatch(subdomain):
         print(f"Error: Invalid subdomain format: {subdomain}")
         sys.exit(1)
     return True
 
 
+def split_account_domain(fqdn, valid_domains):
+    """Split a full domain name into (root domain, subdomain) using the account's domains."""
+    for root in sorted(valid_domains, key=len, reverse=True):
+        if fqdn == root:
+            return root, ""
+        if fqdn.endswith("." + root):
+            return root, fqdn[:-len(root) - 1]
+    return None, None
+
+
 def validate_args(args, valid_domains, provider_name):
     """Validate CLI arguments."""
+    if args.parallel < 1:
+        print("Error: --parallel must be at least 1")
+        sys.exit(1)
+    if args.parallel > 1 and not args.domains:
+        print("Error: --parallel is only supported with --domains")
+        sys.exit(1)
+
+    if args.domains:
+        if args.action != "renew":
+            print("Error: --domains is only supported with --action renew")
+            sys.exit(1)
+        if args.domain or args.subdomain:
+            print("Error: --domains cannot be combined with --domain or --subdomain")
+            sys.exit(1)
+        for fqdn in args.domains:
+            validate_domain(fqdn)
+            if split_account_domain(fqdn, valid_domains)[0] is None:
+                print(f"Error: Domain '{fqdn}' is not under any domain in {provider_name} account")
+                print(f"Available domains: {', '.join(valid_domains)}")
+                sys.exit(1)
+        return
+
     if args.action and not args.domain:
         print("Error: --domain is required when --action is specified")
         sys.exit(1)
@@ -70,38 +182,91 @@ def validate_args(args, valid_domains, provider_name):
             print(f"Available domains: {', '.join(valid_domains)}")
             sys.exit(1)
 
-    if args.subdomain:
-        validate_subdomain(args.subdomain)
+    for subdomain in args.subdomain:
+        if subdomain != "@":
+            validate_subdomain(subdomain)
 
 
-def check_prerequisites(provider_class, interactive=True):
-    """Check that all prerequisites are met before running."""
-    if sys.version_info < (3, 0):
-        print("Error: Python 3.x is required")
-        sys.exit(1)
+# Executables checked by check_prerequisites (apt package names match)
+REQUIRED_TOOLS = ("certbot",)
 
-    if not shutil.which("certbot"):
-        if interactive:
-            answer = input("certbot is not installed. Install it? [y/N]: ")
-            if answer.lower() == 'y':
-                subprocess.run(["sudo", "apt", "install", "-y", "certbot"], check=True)
-            else:
-                sys.exit(1)
-        else:
-            print("Error: certbot is not installed")
-            sys.exit(1)
+# A successful tool check is remembered here for PREREQS_MAX_AGE seconds
+PREREQS_MARKER = os.path.join(cache_dir(), "prereqs.json")
+PREREQS_MAX_AGE = 86400
+
+
+@functools.lru_cache(maxsize=8)
+def _which(name):
+    """Locate an executable, trying the usual system location before walking PATH."""
+    path = os.path.join("/usr/bin", name)
+    if os.access(path, os.X_OK):
+        return path
+    return shutil.which(name)
+
+
+def _prereqs_cached():
+    """True if a recent check already found every required tool."""
+    try:
+        if time.time() - os.path.getmtime(PREREQS_MARKER) > PREREQS_MAX_AGE:
+            return False
+        with open(PREREQS_MARKER, "rb") as f:
+            found = _json.loads(f.read())
+    except (OSError, ValueError):
+        return False
+    # Tools recorded as found must still be there
+    return all(tool in found and os.access(found[tool], os.X_OK) for tool in REQUIRED_TOOLS)
+
+
+def _write_prereqs_marker(found):
+    """Record the located tools; failing to write only costs a re-check next run."""
+    try:
+        os.makedirs(os.path.dirname(PREREQS_MARKER), mode=0o700, exist_ok=True)
+        with open(PREREQS_MARKER, "wb") as f:
+            f.write(_json.dumps(found))
+    except OSError:
+        pass
+
+
+def _clear_prereqs_marker():
+    """Forget a previous successful check."""
+    try:
+        os.remove(PREREQS_MARKER)
+    except OSError:
+        pass
 
-    if not shutil.which("jq"):
+
+def _check_tools(interactive):
+    """Make sure every required tool is installed, offering to install missing ones."""
+    missing = [tool for tool in REQUIRED_TOOLS if not _which(tool)]
+    if missing:
+        _clear_prereqs_marker()
+        names = ", ".join(missing)
         if interactive:
-            answer = input("jq is not installed. Install it? [y/N]: ")
+            answer = input(f"{names} not installed. Install {'it' if len(missing) == 1 else 'them'}? [y/N]: ")
             if answer.lower() == 'y':
-                subprocess.run(["sudo", "apt", "install", "-y", "jq"], check=True)
+                # apt-get has a stable CLI; plain apt warns when scripted
+                subprocess.run(["sudo", "apt-get", "install", "-y", *missing], check=True)
+                _which.cache_clear()
             else:
                 sys.exit(1)
         else:
-            print("Error: jq is not installed")
+            print(f"Error: {names} not installed")
             sys.exit(1)
 
+    found = {tool: _which(tool) for tool in REQUIRED_TOOLS}
+    if all(found.values()):
+        _write_prereqs_marker(found)
+
+
+def check_prerequisites(provider_class, interactive=True, use_cache=True):
+    """Check that all prerequisites are met before running."""
+    if sys.version_info < (3, 10):
+        print("Error: Python 3.10 or newer is required")
+        sys.exit(1)
+
+    if not (use_cache and _prereqs_cached()):
+        _check_tools(interactive)
+
     token_env = provider_class.env_token_name
     if not os.getenv(token_env):
         if interactive:
@@ -117,63 +282,203 @@ def check_prerequisites(provider_class, interactive=True):
 
 def get_user_selection(options, prompt="Select an option:", allow_skip=False):
     """Display a menu and get the user's selection."""
-    for idx, option in enumerate(options, start=1):
-        print(f"{idx}. {option}")
-    choice = input(f"{prompt} ")
-    if allow_skip and choice == '':
-        return None
-    try:
-        choice = int(choice) - 1
-        if choice < 0 or choice >= len(options):
+    # Print the menu once; invalid input only re-prompts
+    sys.stdout.write("".join(f"{idx}. {option}\n" for idx, option in enumerate(options, start=1)))
+    while True:
+        choice = input(f"{prompt} ")
+        if allow_skip and choice == '':
+            return None
+        try:
+            choice = int(choice) - 1
+        except ValueError:
             print("Invalid selection, please try again.")
-            return get_user_selection(options, prompt, allow_skip)
-    except ValueError:
+            continue
+        if 0 <= choice < len(options):
+            return options[choice]
         print("Invalid selection, please try again.")
-        return get_user_selection(options, prompt, allow_skip)
-    return options[choice]
 
 
-def check_dns_propagation(domain):
-    """Check if the DNS TXT record has propagated."""
-    try:
-        txt_records = dns.resolver.resolve(f"_acme-challenge.{domain}", 'TXT')
-        if txt_records:
-            print("DNS propagation check successful.")
-            return True
-    except Exception as e:
-        print(f"DNS propagation check failed: {e}")
-    return False
+def run_streaming(cmd, env=None, timeout=CERTBOT_TIMEOUT, prefix=""):
+    """Run a command, echoing its output as it is produced.
 
+    Each output line is written with `prefix` in front of it. The process
+    is terminated if it runs longer than `timeout` seconds.
+    Raises CalledProcessError on a non-zero exit status.
+    """
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          bufsize=1, text=True, env=env) as proc:
+        timer = threading.Timer(timeout, proc.terminate)
+        timer.start()
+        try:
+            for line in proc.stdout:
+                sys.stdout.write(prefix + line)
+            returncode = proc.wait()
+        finally:
+            timer.cancel()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return returncode
 
-def finalize_certbot(domain, script_dir, provider_name, force_renewal=False):
-    """Run certbot to finalize the certificate issuance."""
-    # Use Python hooks (generic, work with all providers)
-    auth_hook = os.path.join(script_dir, "auth-hook.py")
-    cleanup_hook = os.path.join(script_dir, "cleanup-hook.py")
 
-    # Fallback to shell hooks if Python hooks don't exist
-    if not os.path.exists(auth_hook):
-        auth_hook = os.path.join(script_dir, "auth-hook.sh")
-    if not os.path.exists(cleanup_hook):
-        cleanup_hook = os.path.join(script_dir, "cleanup-hook.sh")
+def check_dns_propagation(domain, expected=None, **kwargs):
+    """Wait until the DNS TXT record has propagated (see providers.propagation)."""
+    # Deferred so dnspython is only imported when a check actually runs
+    from providers.propagation import check_dns_propagation as check
+    return check(domain, expected, **kwargs)
 
-    # Set DNS_PROVIDER env var for hooks
-    env = os.environ.copy()
-    env["DNS_PROVIDER"] = provider_name
+
+@functools.lru_cache(maxsize=None)
+def _certbot_env(provider_name):
+    """
+    Environment for certbot and its hooks, with DNS_PROVIDER set.
+
+    Built on first use rather than at import so a token entered at the
+    interactive prompt is included, then reused for every later run.
+    """
+    return os.environ | {"DNS_PROVIDER": provider_name}
+
+
+def finalize_certbot(domains, provider_name, force_renewal=False, extra_args=(), prefix=""):
+    """Run certbot to finalize the certificate issuance.
+
+    `domains` is a single name or a list of names; a list is issued as one
+    certificate so certbot starts, and sets up the ACME account, only once.
+    `extra_args` are appended to the certbot command line.
+    """
+    if isinstance(domains, str):
+        domains = [domains]
 
     certbot_cmd = [
         "certbot", "certonly", "--manual", "--preferred-challenges=dns",
-        "--manual-public-ip-logging-ok", "-d", domain,
-        "--manual-auth-hook", auth_hook,
-        "--manual-cleanup-hook", cleanup_hook,
+        "--manual-public-ip-logging-ok",
+        *[arg for domain in domains for arg in ("-d", domain)],
+        "--manual-auth-hook", _AUTH_HOOK,
+        "--manual-cleanup-hook", _CLEANUP_HOOK,
         "--non-interactive"
     ]
     if force_renewal:
         certbot_cmd.append("--force-renewal")
+    certbot_cmd.extend(extra_args)
+
+    logger.info("%sExecuting command: %s", prefix, shlex.join(certbot_cmd))
+    return run_streaming(certbot_cmd, env=_certbot_env(provider_name), prefix=prefix) == 0
 
-    print(f"Executing command: {' '.join(certbot_cmd)}")
-    result = subprocess.run(certbot_cmd, check=True, env=env)
-    return result.returncode == 0
+
+def _staging_dirs(domain):
+    """Return the per-domain certbot config, work and logs directories used by --parallel."""
+    base = os.path.join(PARALLEL_BASE_DIR, domain)
+    return {name: os.path.join(base, name) for name in ("config", "work", "logs")}
+
+
+@contextlib.contextmanager
+def _certbot_lock(directory):
+    """Hold certbot's own lock on a directory, so no certbot run uses it meanwhile."""
+    path = os.path.join(directory, ".certbot.lock")
+    while True:
+        fd = os.open(path, os.O_CREAT | os.O_WRONLY, 0o600)
+        fcntl.lockf(fd, fcntl.LOCK_EX)
+        try:
+            # Certbot deletes the file when it releases the lock; retry if
+            # the one we locked is no longer the one at that path
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+    try:
+        yield
+    finally:
+        os.close(fd)
+
+
+def _renew_one(domain, provider_name):
+    """Issue a certificate for one domain in its own staging certbot directories."""
+    dirs = _staging_dirs(domain)
+    # Start from an empty config dir so the new lineage is always <domain>,
+    # version 1, and share the existing ACME account instead of registering
+    shutil.rmtree(dirs["config"], ignore_errors=True)
+    os.makedirs(dirs["config"], mode=0o700)
+    os.symlink(os.path.join(LETSENCRYPT_DIR, "accounts"), os.path.join(dirs["config"], "accounts"))
+
+    extra_args = [
+        "--config-dir", dirs["config"],
+        "--work-dir", dirs["work"],
+        "--logs-dir", dirs["logs"],
+    ]
+    return finalize_certbot(domain, provider_name, force_renewal=True,
+                            extra_args=extra_args, prefix=f"[{domain}] ")
+
+
+def _merge_lineage(domain):
+    """
+    Move a lineage issued by _renew_one into LETSENCRYPT_DIR.
+
+    The certificate is added as the next archive version of an existing
+    lineage, or becomes a new lineage with its renewal config, so
+    `certbot renew`, --action expiry and --action revoke all see it.
+    """
+    dirs = _staging_dirs(domain)
+    src_archive = os.path.join(dirs["config"], "archive", domain)
+    dst_archive = os.path.join(LETSENCRYPT_DIR, "archive", domain)
+    dst_live = os.path.join(LIVE_DIR, domain)
+    renewal_conf = os.path.join(LETSENCRYPT_DIR, "renewal", f"{domain}.conf")
+
+    with _certbot_lock(LETSENCRYPT_DIR):
+        os.makedirs(dst_archive, mode=0o700, exist_ok=True)
+        os.makedirs(dst_live, mode=0o755, exist_ok=True)
+        versions = (_ARCHIVE_VERSION_RE.fullmatch(name) for name in os.listdir(dst_archive))
+        version = max((int(m.group(1)) for m in versions if m), default=0) + 1
+
+        for kind in _LINEAGE_FILES:
+            target = f"{kind}{version}.pem"
+            # copy2 keeps the private key's 0600 mode
+            shutil.copy2(os.path.join(src_archive, f"{kind}1.pem"), os.path.join(dst_archive, target))
+            link = os.path.join(dst_live, f"{kind}.pem")
+            tmp_link = f"{link}.new"
+            if os.path.lexists(tmp_link):
+                os.remove(tmp_link)
+            os.symlink(os.path.join("..", "..", "archive", domain, target), tmp_link)
+            os.replace(tmp_link, link)
+
+        if not os.path.exists(renewal_conf):
+            with open(os.path.join(dirs["config"], "renewal", f"{domain}.conf")) as f:
+                conf = f.read()
+            for staged, real in ((dirs["config"], LETSENCRYPT_DIR),
+                                 (dirs["work"], LETSENCRYPT_WORK_DIR),
+                                 (dirs["logs"], LETSENCRYPT_LOGS_DIR)):
+                conf = conf.replace(staged, real)
+            os.makedirs(os.path.dirname(renewal_conf), mode=0o755, exist_ok=True)
+            with open(renewal_conf, "w") as f:
+                f.write(conf)
+
+    # Don't leave a second copy of the private key behind
+    shutil.rmtree(dirs["config"], ignore_errors=True)
+
+
+def renew_parallel(domains, provider_name, workers):
+    """Renew one certificate per domain with up to `workers` concurrent certbot runs."""
+    if not os.path.isdir(os.path.join(LETSENCRYPT_DIR, "accounts")):
+        print(f"Error: no ACME account in {LETSENCRYPT_DIR}; run 'certbot register' first")
+        return list(domains)
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_renew_one, d, provider_name): d for d in domains}
+        for future in as_completed(futures):
+            domain = futures[future]
+            try:
+                future.result()
+                # Merged one at a time from this thread, under certbot's lock
+                _merge_lineage(domain)
+                print(f"Certificate for {domain} renewed successfully "
+                      f"(saved at {os.path.join(LIVE_DIR, domain)}).")
+            except subprocess.CalledProcessError as e:
+                print(f"Certbot failed for {domain}: {e}")
+                failed.append(domain)
+            except OSError as e:
+                print(f"Failed to store the certificate for {domain}: {e}")
+                failed.append(domain)
+    return failed
 
 
 def revoke_certbot_certificate(domain):
@@ -182,65 +487,119 @@ def revoke_certbot_certificate(domain):
         "certbot", "revoke", "--cert-name", domain,
         "--non-interactive", "--agree-tos"
     ]
-    print(f"Executing command: {' '.join(certbot_revoke_cmd)}")
+    logger.info("Executing command: %s", shlex.join(certbot_revoke_cmd))
     try:
-        result = subprocess.run(certbot_revoke_cmd, check=True)
-        if result.returncode == 0:
+        if run_streaming(certbot_revoke_cmd) == 0:
             print(f"Certificate for domain {domain} successfully revoked.")
     except subprocess.CalledProcessError as e:
         print(f"Failed to revoke certificate for domain {domain}: {e}")
 
 
+def _read_expiry(cert_path):
+    """Read cert.pem under a live directory and return (name, days_left, error)."""
+    # Deferred so actions other than expiry don't pay for importing it
+    from cryptography import x509
+
+    domain_name = os.path.basename(cert_path)
+    try:
+        with open(os.path.join(cert_path, "cert.pem"), "rb") as cert_file, \
+                mmap.mmap(cert_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Only materialise the first (leaf) PEM block
+            end = mm.find(_PEM_END)
+            leaf = mm[:end + len(_PEM_END)] if end != -1 else mm[:]
+        cert = x509.load_pem_x509_certificate(leaf)
+        days_left = (cert.not_valid_after_utc - datetime.now(timezone.utc)).days
+        return domain_name, days_left, None
+    except FileNotFoundError:
+        return domain_name, None, f"Certificate for domain {cert_path} not found."
+    except Exception as e:
+        return domain_name, None, f"An error occurred while checking certificate expiry for {cert_path}: {e}"
+
+
+def _is_lineage_of(name, domain):
+    """True if a live/ directory name is a lineage of domain or one of its subdomains."""
+    base = _LINEAGE_SUFFIX_RE.sub("", name)
+    return base == domain or base.endswith("." + domain)
+
+
 def get_certificate_expiry_days(domain):
     """Get the number of days left before the certificate expires."""
-    cert_paths = glob.glob(f"/etc/letsencrypt/live/{domain}*")
+    try:
+        with os.scandir(LIVE_DIR) as it:
+            cert_paths = [entry.path for entry in it
+                          if _is_lineage_of(entry.name, domain)
+                          and entry.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        cert_paths = []
     if not cert_paths:
         print(f"Certificate for domain {domain} not found.")
         return
 
-    for cert_path in cert_paths:
-        try:
-            with open(os.path.join(cert_path, "cert.pem"), "rb") as cert_file:
-                cert_data = cert_file.read()
-                cert = OpenSSL.crypto.load_certificate(OpenSSL.crypto.FILETYPE_PEM, cert_data)
-                expiry_date = datetime.strptime(cert.get_notAfter().decode("ascii"), "%Y%m%d%H%M%SZ")
-                days_left = (expiry_date - datetime.now()).days
-                domain_name = os.path.basename(cert_path)
-                print(f"Certificate for domain {domain_name} expires in {days_left} days.")
-        except FileNotFoundError:
-            print(f"Certificate for domain {cert_path} not found.")
-        except Exception as e:
-            print(f"An error occurred while checking certificate expiry for {cert_path}: {e}")
+    # Read and parse certificates concurrently, then print in order
+    with ThreadPoolExecutor(max_workers=min(8, len(cert_paths))) as executor:
+        results = list(executor.map(_read_expiry, cert_paths))
+
+    for domain_name, days_left, error in results:
+        if error:
+            print(error)
+        else:
+            print(f"Certificate for domain {domain_name} expires in {days_left} days.")
 
 
-def run_cli_mode(args, provider, script_dir, domain_names):
+def run_cli_mode(args, provider, domain_names):
     """Run in non-interactive CLI mode."""
+    unknown = ((args.domain and args.domain not in domain_names)
+               or any(split_account_domain(fqdn, domain_names)[0] is None for fqdn in args.domains))
+    if unknown and not args.no_cache:
+        # The zone may have been added since the domain list was cached
+        domain_names = provider.cached_domains(no_cache=True)
     validate_args(args, domain_names, provider.name)
 
     if args.action == "renew":
-        full_domain = f"{args.subdomain}.{args.domain}" if args.subdomain else args.domain
-        print(f"Renewing certificate for: {full_domain}")
-
-        if args.subdomain and not provider.check_subdomain_exists(args.domain, args.subdomain):
-            print(f"WARNING: Subdomain '{args.subdomain}' has no A record in {args.domain}")
-            print("         Certificate will be created but subdomain won't resolve.")
+        full_domains = args.domains or _full_domains(args.domain, args.subdomain)
+        print(f"Renewing certificate for: {', '.join(full_domains)}")
+
+        split = [split_account_domain(fqdn, domain_names) for fqdn in full_domains]
+        # Fetch every zone involved at once; the checks below then hit the cache
+        provider.fetch_many_records({root for root, subdomain in split if subdomain},
+                                    no_cache=args.no_cache)
+        for root, subdomain in split:
+            if subdomain and not provider.check_subdomain_exists(root, subdomain):
+                print(f"WARNING: Subdomain '{subdomain}' has no A record in {root}")
+                print("         Certificate will be created but subdomain won't resolve.")
+
+        if args.parallel > 1 and len(full_domains) > 1:
+            failed = renew_parallel(full_domains, provider.name, args.parallel)
+            if failed:
+                print(f"Certbot validation failed for: {', '.join(failed)}")
+                sys.exit(1)
+            return
 
-        if not finalize_certbot(full_domain, script_dir, provider.name, force_renewal=True):
+        if not finalize_certbot(full_domains, provider.name, force_renewal=True):
             print("Certbot validation failed.")
             sys.exit(1)
         print("Certificate renewed successfully.")
 
     elif args.action == "revoke":
-        full_domain = f"{args.subdomain}.{args.domain}" if args.subdomain else args.domain
-        print(f"Revoking certificate for: {full_domain}")
-        revoke_certbot_certificate(full_domain)
+        for full_domain in _full_domains(args.domain, args.subdomain):
+            print(f"Revoking certificate for: {full_domain}")
+            revoke_certbot_certificate(full_domain)
 
     elif args.action == "expiry":
         print(f"Checking certificate expiry for: {args.domain}")
         get_certificate_expiry_days(args.domain)
 
 
-def run_interactive_mode(provider, script_dir, domain_names):
+def prefetch_domain_records(provider, domain, no_cache=False):
+    """Start fetching a domain's DNS records in the background."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(provider.cached_domain_records, domain, no_cache)
+    # The thread exits once the fetch is done; the result is picked up on demand
+    executor.shutdown(wait=False)
+    return future
+
+
+def run_interactive_mode(provider, domain_names, no_cache=False):
     """Run in interactive mode."""
     action = get_user_selection(
         ["Issue a new certificate", "Revoke an existing certificate", "Check certificate expiry"],
@@ -250,6 +609,8 @@ def run_interactive_mode(provider, script_dir, domain_names):
     if action == "Issue a new certificate":
         selected_domain = get_user_selection(domain_names, "Select a domain:")
         print(f"Selected domain: {selected_domain}")
+        # Overlap the record fetch with the next menu choice
+        records_future = prefetch_domain_records(provider, selected_domain, no_cache)
 
         record_action = get_user_selection(
             ["Create a new record", "Overwrite an existing record"],
@@ -258,27 +619,28 @@ def run_interactive_mode(provider, script_dir, domain_names):
 
         if record_action == "Overwrite an existing record":
             print(f"Fetching DNS records for {selected_domain}...")
-            domain_records = provider.fetch_domain_records(selected_domain)
-            record_names = [f"{rec['name']} ({rec['type']})" for rec in domain_records]
+            domain_records = records_future.result()
+            record_names = [f"{rec.name} ({rec.type})" for rec in domain_records]
             selected_record = get_user_selection(record_names, "Select a record to overwrite:")
             record_data = domain_records[record_names.index(selected_record)]
-            record_name = record_data["name"]
+            record_name = record_data.name
 
             if record_name.startswith("_acme-challenge."):
-                subdomain = record_name[len("_acme-challenge."):]
+                subdomains = [record_name[len("_acme-challenge."):]]
             else:
-                subdomain = ""
+                subdomains = []
         else:
-            subdomain = input("Enter the subdomain name (e.g., www, mail): ")
+            subdomains = _comma_list(input("Enter the subdomain name(s), comma-separated (e.g., www, mail): "))
 
         print("Running Certbot to manage DNS challenge and certificate issuance...")
-        full_domain = f"{subdomain}.{selected_domain}" if subdomain else selected_domain
+        full_domains = _full_domains(selected_domain, subdomains)
 
-        if subdomain and not provider.check_subdomain_exists(selected_domain, subdomain):
-            print(f"WARNING: Subdomain '{subdomain}' has no A record in {selected_domain}")
-            print("         Certificate will be created but subdomain won't resolve.")
+        for subdomain in subdomains:
+            if subdomain != "@" and not provider.check_subdomain_exists(selected_domain, subdomain):
+                print(f"WARNING: Subdomain '{subdomain}' has no A record in {selected_domain}")
+                print("         Certificate will be created but subdomain won't resolve.")
 
-        if not finalize_certbot(full_domain, script_dir, provider.name, force_renewal=True):
+        if not finalize_certbot(full_domains, provider.name, force_renewal=True):
             print("Certbot validation failed.")
             return
 
@@ -292,6 +654,11 @@ def run_interactive_mode(provider, script_dir, domain_names):
 
 
 def main():
+    level = logging.getLevelName(os.environ.get("CERTBOT_AUTO_LOGLEVEL", "INFO").upper())
+    if not isinstance(level, int):
+        # Unknown names come back as "Level X"; don't fail over a typo
+        level = logging.INFO
+    logging.basicConfig(stream=sys.stdout, format="%(message)s", level=level)
     args = parse_args()
     interactive = not args.action
 
@@ -301,24 +668,32 @@ def main():
         print(f"Error: {e}")
         sys.exit(1)
 
-    check_prerequisites(provider_class, interactive=interactive)
-
     try:
-        api_token = os.getenv(provider_class.env_token_name)
-        provider = provider_class(api_token)
-        script_dir = os.path.dirname(os.path.abspath(__file__))
+        provider = None
+        # Fetch the domain list while the prerequisite checks run, unless
+        # those may prompt the user and the fetch would print over the prompt
+        quiet_checks = not interactive or (not args.no_cache and _prereqs_cached())
+        if os.getenv(provider_class.env_token_name) and quiet_checks:
+            provider = provider_class(os.getenv(provider_class.env_token_name))
+            provider.prefetch_domains(no_cache=args.no_cache)
+
+        check_prerequisites(provider_class, interactive=interactive, use_cache=not args.no_cache)
+
+        if provider is None:
+            # The token was entered at the prompt
+            provider = provider_class(os.getenv(provider_class.env_token_name))
 
         print(f"Using provider: {provider.name}")
         print("Fetching domains...")
-        domain_names = provider.fetch_domains()
+        domain_names = provider.cached_domains(no_cache=args.no_cache)
 
         if interactive:
-            run_interactive_mode(provider, script_dir, domain_names)
+            run_interactive_mode(provider, domain_names, no_cache=args.no_cache)
         else:
-            run_cli_mode(args, provider, script_dir, domain_names)
+            run_cli_mode(args, provider, domain_names)
 
     except subprocess.CalledProcessError as e:
-        print(f"An error occurred: {e.stderr}")
+        print(f"An error occurred: {e}")
         sys.exit(1)
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
@@ -17,7 +17,7 @@ import sys
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from providers import get_provider
+from providers.hooks import provider_from_env, split_challenge_domain
 
 
 def main():
@@ -31,30 +31,14 @@ def main():
     print(f"DOMAIN: {domain}")
     print(f"PROVIDER: {provider_name}")
 
-    # Determine root domain and subdomain
-    parts = domain.split(".")
-    if len(parts) > 2:
-        root_domain = ".".join(parts[-2:])
-        subdomain = ".".join(parts[:-2])
-        record_name = f"_acme-challenge.{subdomain}"
-    else:
-        root_domain = domain
-        subdomain = ""
-        record_name = "_acme-challenge"
+    root_domain, subdomain, record_name = split_challenge_domain(domain)
 
     print(f"ROOT_DOMAIN: {root_domain}")
     print(f"SUBDOMAIN: {subdomain}")
     print(f"RECORD_NAME: {record_name}")
 
     try:
-        provider_class = get_provider(provider_name)
-        api_token = os.environ.get(provider_class.env_token_name)
-
-        if not api_token:
-            print(f"Error: {provider_class.env_token_name} not set")
-            sys.exit(1)
-
-        provider = provider_class(api_token)
+        provider = provider_from_env(provider_name)
         deleted = provider.cleanup_txt_records(root_domain, record_name)
 
         if deleted > 0:
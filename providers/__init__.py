@@ -1,6 +1,6 @@
 """DNS Provider plugins for CertAutoBot."""
 
-from .base import DNSProvider
+from .base import DNSProvider, DNSRecord, ProviderNotAuthoritative
 from .digitalocean import DigitalOceanProvider
 
 PROVIDERS = {
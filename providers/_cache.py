@@ -0,0 +1,144 @@
+"""Small caches for provider API results."""
+
+import fcntl
+import json
+import os
+import threading
+import time
+
+
+def cache_dir():
+    """Return the per-user cache directory ($XDG_CACHE_HOME/certbot_auto)."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "certbot_auto")
+
+
+class TTLCache:
+    """Dict-backed cache whose entries expire a fixed time after being set."""
+
+    def __init__(self):
+        # key -> (stored_at, expires_at, value)
+        self._data = {}
+
+    def get(self, key, default=None, max_age=None):
+        """
+        Return the value for key, or default if it is missing or expired.
+
+        With max_age, entries stored more than max_age seconds ago are
+        treated as expired too, whatever TTL they were stored with.
+        """
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        now = time.monotonic()
+        if entry[1] <= now or (max_age is not None and now - entry[0] >= max_age):
+            return default
+        return entry[2]
+
+    def set(self, key, value, ttl):
+        """Store value under key for ttl seconds."""
+        now = time.monotonic()
+        self._data[key] = (now, now + ttl, value)
+
+    def invalidate(self, key):
+        """Drop the entry for key, if any."""
+        self._data.pop(key, None)
+
+
+def _valid_entry(file_key, entry):
+    """True if a file entry is a JSON list key with [stored_at, expires_at, value]."""
+    if not (isinstance(entry, list) and len(entry) == 3
+            and all(isinstance(t, (int, float)) for t in entry[:2])):
+        return False
+    try:
+        return isinstance(json.loads(file_key), list)
+    except ValueError:
+        return False
+
+
+class PersistentTTLCache(TTLCache):
+    """
+    TTLCache mirrored to a JSON file, so entries outlive the process.
+
+    Keys must be tuples of JSON values. `default` and `object_hook` are
+    passed to json.dumps()/json.load() for values of other types; values
+    that still can't be encoded are kept in memory only. If the file
+    can't be read or written this behaves like a plain TTLCache; entries
+    that aren't in the expected format are ignored.
+
+    Changes are applied to the file under an flock on a side lock file,
+    so concurrent processes (e.g. two hooks) never overwrite each
+    other's updates.
+    """
+
+    def __init__(self, path, default=None, object_hook=None):
+        super().__init__()
+        self.path = path
+        self._default = default
+        self._object_hook = object_hook
+        self._lock = threading.Lock()
+        # The file holds wall-clock times; convert them to monotonic
+        offset = time.monotonic() - time.time()
+        for key, (stored_at, expires_at, value) in self._read().items():
+            self._data[tuple(json.loads(key))] = (stored_at + offset, expires_at + offset, value)
+
+    def set(self, key, value, ttl):
+        super().set(key, value, ttl)
+        if ttl > 0:
+            now = time.time()
+            self._write_entry(key, [now, now + ttl, value])
+
+    def invalidate(self, key):
+        super().invalidate(key)
+        self._write_entry(key, None)
+
+    def _read(self):
+        """Return unexpired entries from the file as {json key: [stored_at, expires_at, value]}."""
+        try:
+            with open(self.path) as f:
+                entries = json.load(f, object_hook=self._object_hook)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            # Valid JSON but not ours; start over rather than fail every run
+            return {}
+        now = time.time()
+        return {k: v for k, v in entries.items() if _valid_entry(k, v) and v[1] > now}
+
+    def _write_entry(self, key, entry):
+        """Apply one change to the file; None removes the key."""
+        file_key = json.dumps(list(key))
+        try:
+            encoded_entry = json.dumps(entry, default=self._default)
+        except (TypeError, ValueError):
+            # Not persistable; at least don't leave an older value behind
+            entry = encoded_entry = None
+
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path), mode=0o700, exist_ok=True)
+                lock_fd = os.open(f"{self.path}.lock", os.O_WRONLY | os.O_CREAT, 0o600)
+            except OSError:
+                return
+            try:
+                # Held across read-modify-write, so another process's change
+                # made in the meantime is re-read rather than overwritten
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                entries = {k: json.dumps(v, default=self._default) for k, v in self._read().items()}
+                if entry is None:
+                    if entries.pop(file_key, None) is None:
+                        return
+                else:
+                    entries[file_key] = encoded_entry
+                body = "{" + ",".join(f"{json.dumps(k)}:{v}" for k, v in entries.items()) + "}"
+
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(fd, "w") as f:
+                    f.write(body)
+                # Atomic, so readers that don't take the lock never see a partial file
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
+            finally:
+                os.close(lock_fd)
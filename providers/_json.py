@@ -0,0 +1,22 @@
+"""JSON helpers that use orjson when it is installed."""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib json module
+    orjson = None
+
+
+def loads(data):
+    """Parse JSON from bytes or str. Errors are ValueError either way."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj):
+    """Serialize obj to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
@@ -0,0 +1,30 @@
+"""Client-side rate limiting for provider API calls."""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` calls per `per` seconds."""
+
+    def __init__(self, rate, per=60.0):
+        self.capacity = float(rate)
+        self.fill_rate = rate / per
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._updated) * self.fill_rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.fill_rate
+            # Sleep outside the lock so other threads can refill and check
+            time.sleep(wait)
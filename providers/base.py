@@ -1,6 +1,89 @@
 """Base DNS Provider interface."""
 
+import functools
+import hashlib
+import os
+import re
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ._cache import PersistentTTLCache, TTLCache, cache_dir
+from ._ratelimit import TokenBucket
+
+
+@dataclass(slots=True, frozen=True)
+class DNSRecord:
+    """A DNS record as returned by providers."""
+
+    id: int | str  # provider's record ID, passed back to delete_txt_record()
+    name: str  # relative to the zone, e.g. "www" or "_acme-challenge.www"
+    type: str
+    data: str
+
+
+class ProviderNotAuthoritative(Exception):
+    """The provider does not host the requested zone (HTTP 404/410)."""
+
+
+class NotModified(Exception):
+    """Raised by a fetch when the API confirms the cached value (HTTP 304)."""
+
+
+class _Validated:
+    """Cache entry for a value the API sent with an ETag."""
+
+    __slots__ = ("etag", "value")
+
+    def __init__(self, etag, value):
+        self.etag = etag
+        self.value = value
+
+
+class _CachedError:
+    """Cache entry standing in for a failed fetch until it expires."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+def _encode_record(obj):
+    """json.dumps() default for DNSRecord and ETag entries in the persistent cache."""
+    if isinstance(obj, DNSRecord):
+        return {"__dnsrecord__": [obj.id, obj.name, obj.type, obj.data]}
+    if isinstance(obj, _Validated):
+        return {"__etag__": [obj.etag, obj.value]}
+    raise TypeError(f"{type(obj).__name__} is not JSON serializable")
+
+
+def _decode_record(obj):
+    """json.load() object_hook reversing _encode_record()."""
+    if "__dnsrecord__" in obj:
+        return DNSRecord(*obj["__dnsrecord__"])
+    if "__etag__" in obj:
+        return _Validated(*obj["__etag__"])
+    return obj
+
+
+def _retry_after(response, default):
+    """Seconds from a Retry-After header, or default if absent or a date."""
+    try:
+        return max(float(response.headers["Retry-After"]), 0.0)
+    except (KeyError, ValueError):
+        return default
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_patterns(patterns):
+    """Compile each regex in a tuple separately, so their groups and inline flags stay valid."""
+    return tuple(re.compile(p) for p in patterns)
 
 
 class DNSProvider(ABC):
@@ -17,9 +100,110 @@ class DNSProvider(ABC):
     name = "base"
     env_token_name = "DNS_API_TOKEN"
 
+    # Upper bound on concurrent API calls for multi-record operations
+    max_workers = 8
+
+    # Seconds fetched results are reused before being fetched again. Both
+    # can be overridden with {NAME}_CACHE_TTL (e.g. DIGITALOCEAN_CACHE_TTL=0)
+    records_cache_ttl = 300.0
+    domains_cache_ttl = 3600.0
+
+    # Seconds past its TTL a result sent with an ETag is kept, so the
+    # next fetch can ask for it with If-None-Match instead of in full
+    etag_cache_ttl = 86400.0
+
+    # Seconds a "zone not found" answer is remembered, and a rate limit
+    # honoured when the response has no usable Retry-After header
+    negative_cache_ttl = 60.0
+    rate_limit_backoff = 30.0
+
+    # API calls allowed per minute, shared by all threads; None for no limit
+    rate_limit = None
+
+    # Keep cached results in a file under cache_dir() so later runs (and
+    # the hooks) can reuse them; False keeps them in memory only
+    persistent_cache = True
+
+    # Pooled requests.Session for API calls, see build_session()
+    session = None
+
     def __init__(self, api_token):
         """Initialize the provider with API token."""
         self.api_token = api_token
+        # Read before building the cache, which skips the file for a TTL of 0
+        ttl = os.environ.get(f"{self.name.upper()}_CACHE_TTL")
+        if ttl is not None:
+            self.records_cache_ttl = self.domains_cache_ttl = float(ttl)
+        # ("records", domain) -> records; ("domains",) -> list of names
+        self._cache = self._make_cache()
+        # domain -> (records, index by (name, type)) built from the cached list
+        self._indexes = {}
+        # In-flight background fetch started by prefetch_domains()
+        self._domains_future = None
+        self._bucket = TokenBucket(self.rate_limit) if self.rate_limit else None
+        # Per-thread ETags for the fetch _cached_fetch() is running
+        self._conditional = threading.local()
+
+    def _make_cache(self):
+        """Return the result cache: a file per provider and token, or memory only."""
+        # With caching turned off there is nothing to read back or save
+        if not self.persistent_cache or max(self.records_cache_ttl, self.domains_cache_ttl) <= 0:
+            return TTLCache()
+        # Hash the token so different accounts never share cached zones
+        digest = hashlib.sha256((self.api_token or "").encode()).hexdigest()[:16]
+        path = os.path.join(cache_dir(), f"{self.name}-{digest}.json")
+        return PersistentTTLCache(path, default=_encode_record, object_hook=_decode_record)
+
+    def build_session(self):
+        """
+        Create a requests session for the provider's API.
+
+        Consecutive calls reuse pooled TLS connections, at most
+        max_workers per host. Throttling and transient server
+        errors are retried with backoff.
+
+        Returns:
+            requests.Session: New session (callers add auth headers)
+        """
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=self.max_workers,
+            # Past max_workers, wait for a pooled connection rather than
+            # opening (and handshaking) one that is thrown away afterwards
+            pool_block=True,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+                # POST is safe to retry: a duplicate challenge TXT record
+                # is harmless and cleanup removes every match by name
+                allowed_methods=["GET", "POST", "DELETE"],
+                # Hand back the last response so callers see the real status
+                raise_on_status=False,
+            ),
+        ))
+        return session
+
+    def throttle(self):
+        """
+        Wait until another API call fits within rate_limit.
+
+        Providers call this before every request they send.
+        """
+        if self._bucket is not None:
+            self._bucket.acquire()
+
+    def close(self):
+        """Close the provider's HTTP session, if any."""
+        if self.session is not None:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     @abstractmethod
     def fetch_domains(self):
@@ -35,21 +219,40 @@ class DNSProvider(ABC):
         pass
 
     @abstractmethod
-    def fetch_domain_records(self, domain):
+    def fetch_domain_records(self, domain, name=None, record_type=None):
         """
         Fetch DNS records for a domain.
 
+        Providers should apply the filters server-side when the API
+        supports it, and must return only matching records either way.
+
         Args:
             domain: The domain name
+            name: Only return records with this name (e.g., "_acme-challenge.www")
+            record_type: Only return records of this type (e.g., "TXT")
 
         Returns:
-            list: List of record dicts with keys: id, name, type, data
+            list: List of DNSRecord
 
         Example:
-            [{"id": 123, "name": "www", "type": "A", "data": "1.2.3.4"}]
+            [DNSRecord(id=123, name="www", type="A", data="1.2.3.4")]
         """
         pass
 
+    def iter_domain_records(self, domain, name=None, record_type=None):
+        """
+        Yield DNS records for a domain as they are fetched.
+
+        Takes the same filters as fetch_domain_records(). Providers with
+        paginated APIs should override this to fetch a page only when
+        the previous one is used up, so a caller that stops early skips
+        the remaining requests. The default wraps fetch_domain_records().
+
+        Yields:
+            DNSRecord: Matching records
+        """
+        yield from self.fetch_domain_records(domain, name=name, record_type=record_type)
+
     @abstractmethod
     def create_txt_record(self, domain, record_name, value, ttl=60):
         """
@@ -62,7 +265,7 @@ class DNSProvider(ABC):
             ttl: Time to live in seconds
 
         Returns:
-            dict: Created record with 'id' key, or None on failure
+            DNSRecord: Created record, or None on failure
         """
         pass
 
@@ -80,6 +283,232 @@ class DNSProvider(ABC):
         """
         pass
 
+    def cached_domains(self, no_cache=False):
+        """
+        Fetch the list of domains, reusing a recent result.
+
+        Args:
+            no_cache: Always ask the API (the result is still cached)
+
+        Returns:
+            list: Same as fetch_domains()
+        """
+        future, self._domains_future = self._domains_future, None
+        if future is not None and (future.no_cache or not no_cache):
+            return future.result()
+        return self._load_domains(no_cache)
+
+    def _load_domains(self, no_cache=False):
+        """Fetch the domain list through the cache."""
+        return self._cached_fetch(("domains",), self.domains_cache_ttl,
+                                  self.fetch_domains, no_cache)
+
+    def prefetch_domains(self, no_cache=False):
+        """
+        Start fetching the domain list in a background thread.
+
+        The next cached_domains() call waits for this fetch instead of
+        starting its own, so the API round-trip overlaps whatever the
+        caller does in between. Errors are raised by that call.
+
+        Args:
+            no_cache: Always ask the API, as for cached_domains()
+
+        Returns:
+            concurrent.futures.Future: Resolves to the list of domains
+        """
+        if self._domains_future is None:
+            executor = ThreadPoolExecutor(max_workers=1)
+            self._domains_future = executor.submit(self._load_domains, no_cache)
+            self._domains_future.no_cache = no_cache
+            # The thread exits once the fetch is done
+            executor.shutdown(wait=False)
+        return self._domains_future
+
+    def cached_domain_records(self, domain, no_cache=False):
+        """
+        Fetch DNS records for a domain, reusing a recent result.
+
+        Results are kept for records_cache_ttl seconds, or until
+        invalidate_records() is called for the domain.
+
+        Args:
+            domain: The domain name
+            no_cache: Always ask the API (the result is still cached)
+
+        Returns:
+            list: Same as fetch_domain_records()
+
+        Raises:
+            ProviderNotAuthoritative: If the provider doesn't host the domain
+        """
+        return self._cached_fetch(("records", domain), self.records_cache_ttl,
+                                  lambda: self.fetch_domain_records(domain),
+                                  no_cache, domain=domain)
+
+    def _cached_fetch(self, key, ttl, fetch, no_cache=False, domain=None):
+        """
+        Return the cached value for key, calling fetch() on a miss.
+
+        Failures that repeating the request wouldn't fix are cached too:
+        a 404/410 for `domain` for negative_cache_ttl seconds, and a 429
+        for as long as the provider's Retry-After asks. Until then the
+        same error is raised again without an API call.
+
+        Providers that support conditional requests read the ETag of an
+        expired entry with _request_etag(), raise NotModified on a 304
+        and report the new ETag with _response_etag(); the cached value
+        is then reused and its TTL refreshed.
+        """
+        # Cap the age at the current TTL: an entry saved by an earlier run
+        # may have been stored with a longer one
+        cached = None if no_cache else self._cache.get(key, max_age=ttl)
+        if isinstance(cached, _CachedError):
+            raise cached.error
+        if isinstance(cached, _Validated):
+            return cached.value
+        if cached is not None:
+            return cached
+
+        # Past its TTL, an entry with an ETag can still be revalidated
+        stale = self._cache.get(key)
+        stale = stale if isinstance(stale, _Validated) else None
+        self._conditional.request_etag = stale.etag if stale else None
+        self._conditional.response_etag = None
+        try:
+            value = fetch()
+            etag = self._conditional.response_etag
+        except NotModified:
+            value, etag = stale.value, stale.etag
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if status in (404, 410) and domain is not None:
+                error = ProviderNotAuthoritative(f"{self.name} does not host {domain}")
+                self._cache.set(key, _CachedError(error), self.negative_cache_ttl)
+                raise error from e
+            if status == 429:
+                self._cache.set(key, _CachedError(e),
+                                _retry_after(e.response, self.rate_limit_backoff))
+            raise
+        finally:
+            self._conditional.request_etag = self._conditional.response_etag = None
+        if etag and ttl > 0:
+            # Kept past the TTL for revalidation; get(max_age=ttl) still expires it
+            self._cache.set(key, _Validated(etag, value), ttl + self.etag_cache_ttl)
+        else:
+            self._cache.set(key, value, ttl)
+        return value
+
+    def _request_etag(self):
+        """
+        Return the ETag to send as If-None-Match, at most once per fetch.
+
+        Returns:
+            str: ETag of the expired cached value, or None
+        """
+        etag = getattr(self._conditional, "request_etag", None)
+        self._conditional.request_etag = None
+        return etag
+
+    def _response_etag(self, etag):
+        """
+        Record the ETag of the response a fetch is returning.
+
+        Args:
+            etag: The ETag header, or None to not cache one (e.g. for
+                results assembled from several pages)
+        """
+        self._conditional.response_etag = etag
+
+    def _records_index(self, domain):
+        """Return cached records grouped by (name, type) for O(1) lookups."""
+        records = self.cached_domain_records(domain)
+        cached = self._indexes.get(domain)
+        # Rebuild only when the cache handed back a different list
+        if cached is None or cached[0] is not records:
+            index = {}
+            for rec in records:
+                index.setdefault((rec.name, rec.type), []).append(rec)
+            cached = self._indexes[domain] = (records, index)
+        return cached[1]
+
+    def fetch_many_records(self, domains, no_cache=False):
+        """
+        Fetch (cached) DNS records for several domains concurrently.
+
+        Args:
+            domains: Iterable of domain names
+            no_cache: Always ask the API, as for cached_domain_records()
+
+        Returns:
+            dict: Domain name -> list of records, as cached_domain_records()
+        """
+        domains = list(domains)
+        return dict(zip(domains, self._run_concurrently(
+            lambda d: self.cached_domain_records(d, no_cache), domains)))
+
+    def _run_concurrently(self, func, items):
+        """
+        Map func over items with up to max_workers calls in flight.
+
+        Args:
+            func: Callable taking one item
+            items: List of items
+
+        Returns:
+            list: func's results, in the order of items
+        """
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+    def invalidate_records(self, domain):
+        """
+        Drop cached records for a domain.
+
+        Providers call this after creating or deleting a record.
+
+        Args:
+            domain: The domain name
+        """
+        self._cache.invalidate(("records", domain))
+
+    def create_txt_records(self, domain, records):
+        """
+        Create several TXT records in one go.
+
+        Providers with a batch endpoint should override this to send a
+        single request (and invalidate the domain's cache once); the
+        default creates the records one by one.
+
+        Args:
+            domain: Root domain
+            records: List of dicts with keys: name, value, ttl (optional)
+
+        Returns:
+            list: Created DNSRecord (None for any that failed), in order
+        """
+        return [self.create_txt_record(domain, r["name"], r["value"], ttl=r.get("ttl", 60))
+                for r in records]
+
+    def delete_txt_records(self, domain, record_ids):
+        """
+        Delete several TXT records by ID.
+
+        Providers with a batch endpoint should override this; the default
+        sends the deletes concurrently, up to max_workers at a time.
+
+        Args:
+            domain: Root domain
+            record_ids: IDs of the records to delete
+
+        Returns:
+            list: True/False for each ID, in order
+        """
+        # Deletes are independent round-trips, so let them overlap
+        return self._run_concurrently(lambda rid: self.delete_txt_record(domain, rid), list(record_ids))
+
     def find_txt_records(self, domain, record_name):
         """
         Find TXT records matching a name.
@@ -89,10 +518,47 @@ class DNSProvider(ABC):
             record_name: Record name to find
 
         Returns:
-            list: List of matching record dicts
+            list: List of matching DNSRecord
+        """
+        return self.fetch_domain_records(domain, name=record_name, record_type="TXT")
+
+    def find_txt_records_matching(self, domain, patterns):
+        """
+        Find TXT records whose name fully matches any of several regexes.
+
+        Args:
+            domain: Root domain
+            patterns: Regex strings, e.g. [r"_acme-challenge(\\..+)?"]
+
+        Returns:
+            list: List of matching DNSRecord
+        """
+        if not patterns:
+            return []
+        compiled = _compile_patterns(tuple(patterns))
+        return [rec for rec in self.iter_domain_records(domain, record_type="TXT")
+                if any(regex.fullmatch(rec.name) for regex in compiled)]
+
+    def wait_for_propagation(self, domain, record_name, value, timeout=120):
+        """
+        Wait until the zone's authoritative nameservers serve a TXT record.
+
+        All nameservers are queried in parallel, repeating with backoff
+        until they agree or the timeout passes. Providers whose API
+        reports when a change is live may override this.
+
+        Args:
+            domain: Root domain (e.g., "example.com")
+            record_name: Record name (e.g., "_acme-challenge.www")
+            value: TXT value that must be served
+            timeout: Seconds to keep checking
+
+        Returns:
+            bool: True if the record propagated in time
         """
-        records = self.fetch_domain_records(domain)
-        return [r for r in records if r['type'] == 'TXT' and r['name'] == record_name]
+        # Deferred so dnspython is only imported by callers that wait
+        from .propagation import wait_for_txt_record
+        return wait_for_txt_record(f"{record_name}.{domain}", value, timeout=timeout)
 
     def check_subdomain_exists(self, domain, subdomain):
         """
@@ -107,11 +573,7 @@ class DNSProvider(ABC):
         """
         if not subdomain:
             return True
-        records = self.fetch_domain_records(domain)
-        for rec in records:
-            if rec['name'] == subdomain and rec['type'] == 'A':
-                return True
-        return False
+        return (subdomain, 'A') in self._records_index(domain)
 
     def cleanup_txt_records(self, domain, record_name):
         """
@@ -125,8 +587,5 @@ class DNSProvider(ABC):
             int: Number of records deleted
         """
         records = self.find_txt_records(domain, record_name)
-        deleted = 0
-        for rec in records:
-            if self.delete_txt_record(domain, rec['id']):
-                deleted += 1
-        return deleted
+        results = self.delete_txt_records(domain, [rec.id for rec in records])
+        return sum(1 for ok in results if ok)
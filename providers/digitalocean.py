@@ -1,7 +1,13 @@
 """DigitalOcean DNS Provider plugin."""
 
+import logging
+
 import requests
-from .base import DNSProvider
+
+from . import _json
+from .base import DNSProvider, DNSRecord, NotModified
+
+logger = logging.getLogger(__name__)
 
 
 class DigitalOceanProvider(DNSProvider):
@@ -11,51 +17,126 @@ class DigitalOceanProvider(DNSProvider):
     env_token_name = "DIGITALOCEAN_API_TOKEN"
     api_base = "https://api.digitalocean.com/v2"
 
-    def __init__(self, api_token):
+    # (connect, read) timeouts in seconds
+    timeout = (3.05, 10)
+
+    # Concurrent API calls for bulk operations; also used as the pool size
+    max_workers = 10
+
+    # The API allows 250 requests per minute (and 5000 per hour)
+    rate_limit = 250
+
+    # Largest page size the API accepts
+    per_page = 200
+
+    def __init__(self, api_token, session=None):
         super().__init__(api_token)
         self.headers = {
             "Authorization": f"Bearer {api_token}",
             "Content-Type": "application/json",
         }
+        # One pooled session per provider so consecutive API calls reuse
+        # the same TLS connection instead of handshaking every time.
+        if session is None:
+            session = self.build_session()
+        session.headers.update(self.headers)
+        self.session = session
+
+        # Full URL templates, so _request doesn't have to prefix api_base
+        self._domains_url = f"{self.api_base}/domains"
+        self._records_url = self.api_base + "/domains/{domain}/records"
+        self._record_url = self.api_base + "/domains/{domain}/records/{rid}"
 
-    def _request(self, method, endpoint, data=None):
-        """Make an API request."""
-        url = f"{self.api_base}{endpoint}"
-        print(f"Executing API request: {method} {url}")
+    def _request(self, method, endpoint, data=None, params=None):
+        """Make an API request. `endpoint` may also be a full API URL."""
+        url = endpoint if endpoint.startswith(self.api_base) else f"{self.api_base}{endpoint}"
+        # DEBUG only: background fetches must not print over a prompt
+        logger.debug("Executing API request: %s %s", method, url)
+        self.throttle()
 
-        response = requests.request(
+        if method == "GET":
+            return self._conditional_get(url, params)
+
+        # Encoded here so orjson is used when installed; the session
+        # already sends Content-Type: application/json
+        response = self.session.request(
             method,
             url,
-            headers=self.headers,
-            json=data,
-            timeout=30
+            data=_json.dumps(data) if data is not None else None,
+            params=params,
+            timeout=self.timeout
         )
         response.raise_for_status()
+        return self._decode(response)
+
+    def _conditional_get(self, url, params=None):
+        """GET with the expired cache entry's ETag; NotModified on 304."""
+        etag = self._request_etag()
+        headers = {"If-None-Match": etag} if etag else None
+
+        response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and etag:
+            raise NotModified(url)
+        response.raise_for_status()
+        self._response_etag(response.headers.get("ETag"))
+        return self._decode(response)
 
+    @staticmethod
+    def _decode(response):
+        """Parse a JSON response body; None for 204 No Content."""
         if response.status_code == 204:
             return None
-        return response.json()
+        return _json.loads(response.content)
+
+    def _paginate(self, endpoint, key, params=None):
+        """Yield items under `key` from every page of a list endpoint."""
+        params = {"per_page": self.per_page, **(params or {})}
+        pages = 0
+        while endpoint:
+            data = self._request("GET", endpoint, params=params)
+            pages += 1
+            yield from data.get(key, [])
+            # The next-page link already carries the query string
+            endpoint = data.get("links", {}).get("pages", {}).get("next")
+            params = None
+        if pages > 1:
+            # One page's ETag doesn't cover the whole listing
+            self._response_etag(None)
 
     def fetch_domains(self):
         """Fetch list of domains from DigitalOcean."""
-        data = self._request("GET", "/domains")
-        return [d["name"] for d in data.get("domains", [])]
-
-    def fetch_domain_records(self, domain):
-        """Fetch DNS records for a domain."""
-        data = self._request("GET", f"/domains/{domain}/records")
-        records = []
-        for rec in data.get("domain_records", []):
-            records.append({
-                "id": rec["id"],
-                "name": rec["name"],
-                "type": rec["type"],
-                "data": rec.get("data", ""),
-            })
-        return records
+        return [d["name"] for d in self._paginate(self._domains_url, "domains")]
 
-    def create_txt_record(self, domain, record_name, value, ttl=60):
-        """Create a TXT record."""
+    def fetch_domain_records(self, domain, name=None, record_type=None):
+        """Fetch DNS records for a domain, filtered server-side by name and type."""
+        return list(self.iter_domain_records(domain, name, record_type))
+
+    def iter_domain_records(self, domain, name=None, record_type=None):
+        """Yield DNS records page by page, filtered server-side by name and type."""
+        params = {}
+        if name is not None:
+            # The API filters on the fully qualified name
+            params["name"] = domain if name in ("", "@") else f"{name}.{domain}"
+            name = name or "@"
+        if record_type is not None:
+            params["type"] = record_type
+
+        for rec in self._paginate(self._records_url.format(domain=domain), "domain_records", params):
+            # Check again locally: callers delete what this yields, so an
+            # ignored filter or a next link without the query must not leak
+            if record_type is not None and rec["type"] != record_type:
+                continue
+            if name is not None and rec["name"] != name:
+                continue
+            yield self._to_record(rec)
+
+    @staticmethod
+    def _to_record(rec):
+        """Build a DNSRecord from an API domain_record object."""
+        return DNSRecord(rec["id"], rec["name"], rec["type"], rec.get("data", ""))
+
+    def _post_txt_record(self, domain, record_name, value, ttl):
+        """Create a TXT record, reusing an identical one; the caller invalidates the cache."""
         data = {
             "type": "TXT",
             "name": record_name,
@@ -64,20 +145,54 @@ class DigitalOceanProvider(DNSProvider):
         }
 
         try:
-            result = self._request("POST", f"/domains/{domain}/records", data)
-            record = result.get("domain_record", {})
-            print(f"DNS TXT record created successfully (ID: {record.get('id')}).")
+            # Upsert on (zone, name, value): a repeated challenge reuses the
+            # record. Stops paging as soon as a match turns up.
+            for rec in self.iter_domain_records(domain, record_name, "TXT"):
+                if rec.data == value:
+                    print(f"DNS TXT record already exists (ID: {rec.id}).")
+                    return rec
+
+            result = self._request("POST", self._records_url.format(domain=domain), data)
+            record = self._to_record(result["domain_record"])
+            print(f"DNS TXT record created successfully (ID: {record.id}).")
             return record
         except requests.RequestException as e:
             print(f"Failed to create DNS TXT record: {e}")
             return None
 
-    def delete_txt_record(self, domain, record_id):
-        """Delete a TXT record by ID."""
+    def _delete_record(self, domain, record_id):
+        """Delete a record by ID; the caller invalidates the cache."""
         try:
-            self._request("DELETE", f"/domains/{domain}/records/{record_id}")
+            self._request("DELETE", self._record_url.format(domain=domain, rid=record_id))
             print(f"DNS TXT record {record_id} deleted successfully.")
             return True
         except requests.RequestException as e:
             print(f"Failed to delete DNS TXT record {record_id}: {e}")
             return False
+
+    def create_txt_record(self, domain, record_name, value, ttl=60):
+        """Create a TXT record."""
+        record = self._post_txt_record(domain, record_name, value, ttl)
+        self.invalidate_records(domain)
+        return record
+
+    def create_txt_records(self, domain, records):
+        """Create several TXT records with overlapping API calls."""
+        created = self._run_concurrently(
+            lambda r: self._post_txt_record(domain, r["name"], r["value"], r.get("ttl", 60)),
+            records
+        )
+        self.invalidate_records(domain)
+        return created
+
+    def delete_txt_record(self, domain, record_id):
+        """Delete a TXT record by ID."""
+        deleted = self._delete_record(domain, record_id)
+        self.invalidate_records(domain)
+        return deleted
+
+    def delete_txt_records(self, domain, record_ids):
+        """Delete several TXT records with overlapping API calls."""
+        deleted = self._run_concurrently(lambda rid: self._delete_record(domain, rid), list(record_ids))
+        self.invalidate_records(domain)
+        return deleted
@@ -0,0 +1,44 @@
+"""Helpers shared by the Certbot auth and cleanup hooks."""
+
+import os
+
+from . import get_provider
+
+
+def split_challenge_domain(domain):
+    """
+    Split a domain being validated into its zone and challenge record.
+
+    Args:
+        domain: Domain from CERTBOT_DOMAIN (e.g., "www.example.com")
+
+    Returns:
+        tuple: (root_domain, subdomain, record_name), e.g.
+            ("example.com", "www", "_acme-challenge.www")
+    """
+    parts = domain.split(".")
+    if len(parts) > 2:
+        root_domain = ".".join(parts[-2:])
+        subdomain = ".".join(parts[:-2])
+        return root_domain, subdomain, f"_acme-challenge.{subdomain}"
+    return domain, "", "_acme-challenge"
+
+
+def provider_from_env(provider_name):
+    """
+    Instantiate a provider with its API token from the environment.
+
+    Args:
+        provider_name: Registered provider name (e.g., "digitalocean")
+
+    Returns:
+        DNSProvider: Provider instance
+
+    Raises:
+        ValueError: If the provider is unknown or its token is not set
+    """
+    provider_class = get_provider(provider_name)
+    api_token = os.environ.get(provider_class.env_token_name)
+    if not api_token:
+        raise ValueError(f"{provider_class.env_token_name} not set")
+    return provider_class(api_token)
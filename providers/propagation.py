@@ -0,0 +1,226 @@
+"""DNS propagation checks for DNS-01 challenges."""
+
+import asyncio
+import functools
+import os
+import re
+import time
+
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+import requests
+
+from . import _json
+
+# Shared resolver with short timeouts so a stale server can't stall a check
+_RESOLVER = dns.resolver.Resolver()
+_RESOLVER.timeout = 1.0
+_RESOLVER.lifetime = 2.0
+
+# Seconds a successful check, or an NXDOMAIN answer, is remembered
+_PROPAGATION_CACHE_TTL = 30
+_NEGATIVE_CACHE_TTL = 1.0
+
+# (qname, expected, nameservers) -> (checked_at, propagated)
+_propagation_cache = {}
+
+# JSON DNS-over-HTTPS endpoints, tried in order when UDP/53 is unusable
+DOH_ENDPOINTS = (
+    "https://cloudflare-dns.com/dns-query",
+    "https://dns.google/resolve",
+)
+DOH_TIMEOUT = (3.05, 5)
+
+# DoH endpoints are recursive resolvers that cache an NXDOMAIN for the
+# zone's negative TTL (often 30 minutes), so give a new record this many
+# seconds to reach the authoritative servers before asking them
+DOH_DELAY = 10.0
+
+# qname -> monotonic time of the first lookup
+_first_lookup = {}
+
+# Set CERTBOT_AUTO_DOH=1 behind proxies to skip the UDP/53 attempt entirely
+_FORCE_DOH = os.environ.get("CERTBOT_AUTO_DOH") == "1"
+
+# Cloudflare, Google, Quad9 and OpenDNS, for a view closer to the CA's
+# validators in other networks
+PUBLIC_RESOLVERS = ("1.1.1.1", "8.8.8.8", "9.9.9.9", "208.67.222.222")
+
+# Set CERTBOT_AUTO_PUBLIC_CHECK=1 to also require the public resolvers
+_CHECK_PUBLIC = os.environ.get("CERTBOT_AUTO_PUBLIC_CHECK") == "1"
+
+# Quoted character-strings in a DoH TXT "data" field
+_TXT_STRING_RE = re.compile(r'"((?:[^"\\]|\\.)*)"')
+
+_doh_session = requests.Session()
+_doh_session.headers["Accept"] = "application/dns-json"
+
+
+@functools.lru_cache(maxsize=128)
+def _zone_for(domain):
+    """Return the zone (SOA owner) that contains a domain."""
+    return dns.resolver.zone_for_name(domain, resolver=_RESOLVER).to_text()
+
+
+@functools.lru_cache(maxsize=128)
+def _authoritative_ns(zone):
+    """Return the IP addresses of the authoritative nameservers for a zone."""
+    ips = []
+    for ns in _RESOLVER.resolve(zone, 'NS'):
+        ips.extend(a.to_text() for a in _RESOLVER.resolve(ns.target, 'A'))
+    return tuple(ips)
+
+
+async def _query_txt(qname, nameserver):
+    """Return the set of TXT values a single nameserver serves for qname."""
+    resolver = dns.asyncresolver.Resolver(configure=False)
+    resolver.timeout = _RESOLVER.timeout
+    resolver.lifetime = _RESOLVER.lifetime
+    resolver.nameservers = [nameserver]
+    answer = await resolver.resolve(qname, 'TXT')
+    return {b"".join(r.strings).decode() for r in answer}
+
+
+async def _query_all(qname, nameservers):
+    """Query every nameserver concurrently; failures are returned as exceptions."""
+    return await asyncio.gather(*(_query_txt(qname, ns) for ns in nameservers),
+                                return_exceptions=True)
+
+
+def _query_txt_doh(qname):
+    """Return the set of TXT values for qname using DNS-over-HTTPS."""
+    error = None
+    for url in DOH_ENDPOINTS:
+        try:
+            response = _doh_session.get(url, params={"name": qname, "type": "TXT"},
+                                        timeout=DOH_TIMEOUT)
+            response.raise_for_status()
+            answers = _json.loads(response.content).get("Answer", [])
+        except (requests.RequestException, ValueError) as e:
+            error = e
+            continue
+        # type 16 is TXT; CNAMEs along the way are also listed in Answer
+        return {"".join(_TXT_STRING_RE.findall(a["data"])) or a["data"]
+                for a in answers if a.get("type") == 16}
+    raise error
+
+
+def _lookup(qname, nameservers):
+    """
+    Query qname on every nameserver, falling back to DNS-over-HTTPS.
+
+    Returns:
+        tuple: (servers, results) where each result is a set or an exception
+    """
+    first = _first_lookup.setdefault(qname, time.monotonic())
+    if not nameservers and not _FORCE_DOH:
+        try:
+            # Ask the zone's authoritative servers directly, skipping recursion
+            nameservers = _authoritative_ns(_zone_for(qname))
+        except dns.exception.DNSException as e:
+            print(f"Nameserver lookup failed ({e}), using DNS-over-HTTPS")
+    if nameservers:
+        results = asyncio.run(_query_all(qname, nameservers))
+        if not all(isinstance(r, dns.exception.Timeout) for r in results):
+            return list(nameservers), results
+        print("No nameserver answered on UDP/53, using DNS-over-HTTPS")
+    wait = DOH_DELAY - (time.monotonic() - first)
+    if wait > 0:
+        time.sleep(wait)
+    return ["DNS-over-HTTPS"], [_query_txt_doh(qname)]
+
+
+def _check_once(qname, expected, nameservers):
+    """Run a single propagation check across all nameservers."""
+    key = (qname, expected, tuple(nameservers) if nameservers else None)
+    cached = _propagation_cache.get(key)
+    if cached is not None:
+        checked_at, propagated = cached
+        age = time.monotonic() - checked_at
+        if propagated and age < _PROPAGATION_CACHE_TTL:
+            print("DNS propagation check successful (cached).")
+            return True
+        if not propagated and age < _NEGATIVE_CACHE_TTL:
+            return False
+
+    try:
+        servers, results = _lookup(qname, nameservers)
+    except Exception as e:
+        print(f"DNS propagation check failed: {e}")
+        return False
+
+    ready = 0
+    for server, result in zip(servers, results):
+        if isinstance(result, dns.resolver.NXDOMAIN):
+            _propagation_cache[key] = (time.monotonic(), False)
+        if isinstance(result, Exception):
+            print(f"DNS propagation check failed on {server}: {result}")
+        elif result and (expected is None or expected in result):
+            ready += 1
+
+    if ready == len(servers):
+        _propagation_cache[key] = (time.monotonic(), True)
+        print(f"DNS propagation check successful on all {ready} nameservers.")
+        return True
+    print(f"DNS propagation check: record visible on {ready}/{len(servers)} nameservers.")
+    return False
+
+
+def wait_for_txt_record(qname, expected=None, nameservers=None, timeout=900,
+                        initial_interval=1.0, max_interval=30.0, public=None):
+    """
+    Wait until a DNS TXT record has propagated.
+
+    Every nameserver is queried in parallel and all of them must serve
+    the record, since authoritative servers can lag behind each other.
+    Checks repeat with a backoff that grows by 1.5x per attempt, so a
+    fast propagation returns quickly and a slow one isn't hammered.
+
+    With `public`, PUBLIC_RESOLVERS must also serve the record. They are
+    only asked once the authoritative servers agree: recursive resolvers
+    cache a negative answer, so asking them early delays propagation.
+
+    Args:
+        qname: Fully qualified record name (e.g., "_acme-challenge.www.example.com")
+        expected: TXT value that must be present, or None to accept any
+        nameservers: IPs to query instead of the zone's authoritative servers
+        timeout: Seconds to keep polling; 0 checks only once
+        initial_interval: Seconds to wait after the first failed check
+        max_interval: Upper bound for the wait between checks
+        public: Also check PUBLIC_RESOLVERS; defaults to CERTBOT_AUTO_PUBLIC_CHECK
+
+    Returns:
+        bool: True if every nameserver answers with the record in time
+    """
+    if public is None:
+        public = _CHECK_PUBLIC
+
+    def propagated():
+        return (_check_once(qname, expected, nameservers)
+                and (not public or _check_once(qname, expected, PUBLIC_RESOLVERS)))
+
+    deadline = time.monotonic() + timeout
+    interval = initial_interval
+    while not propagated():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 1.5, max_interval)
+    return True
+
+
+def check_dns_propagation(domain, expected=None, **kwargs):
+    """
+    Wait until the DNS-01 challenge record for a domain has propagated.
+
+    Args:
+        domain: Domain being validated (e.g., "www.example.com")
+        expected: TXT value that must be present, or None to accept any
+        **kwargs: Passed to wait_for_txt_record()
+
+    Returns:
+        bool: True if every nameserver answers with the record in time
+    """
+    return wait_for_txt_record(f"_acme-challenge.{domain}", expected, **kwargs)
@@ -11,8 +11,8 @@ To create a new provider:
    PROVIDERS["yourprovider"] = YourProviderProvider
 """
 
-import requests
-from .base import DNSProvider
+from . import _json
+from .base import DNSProvider, DNSRecord
 
 
 class TemplateProvider(DNSProvider):
@@ -27,6 +27,12 @@ class TemplateProvider(DNSProvider):
     # API base URL
     api_base = "https://api.yourprovider.com/v1"
 
+    # Seconds to wait for an API response
+    timeout = 30
+
+    # Requests per minute the API allows; _request() throttles to it
+    rate_limit = None
+
     def __init__(self, api_token):
         super().__init__(api_token)
         # Set up headers or authentication
@@ -34,6 +40,21 @@ class TemplateProvider(DNSProvider):
             "Authorization": f"Bearer {api_token}",
             "Content-Type": "application/json",
         }
+        # Pooled session with retries; use it for every API call. The
+        # auth headers are sent by the session, not passed per request.
+        self.session = self.build_session()
+        self.session.headers.update(self.headers)
+
+        # URL templates, built once instead of in every call
+        self._domains_url = f"{self.api_base}/domains"
+        self._records_url = self.api_base + "/domains/{domain}/records"
+        self._record_url = self.api_base + "/domains/{domain}/records/{rid}"
+
+    def _request(self, method, url, **kwargs):
+        """Make an API call through the session, waiting for the rate limit first."""
+        self.throttle()
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
 
     def fetch_domains(self):
         """
@@ -43,39 +64,33 @@ class TemplateProvider(DNSProvider):
             list: List of domain names (strings)
         """
         # Example implementation:
-        # response = requests.get(
-        #     f"{self.api_base}/domains",
-        #     headers=self.headers,
-        #     timeout=30
-        # )
+        # response = self._request("GET", self._domains_url)
         # response.raise_for_status()
-        # return [d["name"] for d in response.json()["domains"]]
+        # # _json uses orjson when installed and parses the raw bytes
+        # return [d["name"] for d in _json.loads(response.content)["domains"]]
 
         raise NotImplementedError("Implement fetch_domains()")
 
-    def fetch_domain_records(self, domain):
+    def fetch_domain_records(self, domain, name=None, record_type=None):
         """
-        Fetch DNS records for a domain.
+        Fetch DNS records for a domain, optionally filtered by name and type.
 
         Returns:
-            list: List of dicts with keys: id, name, type, data
+            list: List of DNSRecord
         """
-        # Example implementation:
-        # response = requests.get(
-        #     f"{self.api_base}/domains/{domain}/records",
-        #     headers=self.headers,
-        #     timeout=30
+        # Example implementation (pass the filters to the API if it
+        # supports them, otherwise filter the list before returning):
+        # params = {"name": name, "type": record_type}
+        # response = self._request(
+        #     "GET",
+        #     self._records_url.format(domain=domain),
+        #     params={k: v for k, v in params.items() if v is not None},
         # )
         # response.raise_for_status()
-        # records = []
-        # for rec in response.json()["records"]:
-        #     records.append({
-        #         "id": rec["id"],
-        #         "name": rec["name"],
-        #         "type": rec["type"],
-        #         "data": rec["content"],
-        #     })
-        # return records
+        # return [
+        #     DNSRecord(rec["id"], rec["name"], rec["type"], rec["content"])
+        #     for rec in _json.loads(response.content)["records"]
+        # ]
 
         raise NotImplementedError("Implement fetch_domain_records()")
 
@@ -84,7 +99,7 @@ class TemplateProvider(DNSProvider):
         Create a TXT record for DNS challenge.
 
         Returns:
-            dict: Created record with 'id' key, or None on failure
+            DNSRecord: Created record, or None on failure
         """
         # Example implementation:
         # data = {
@@ -93,14 +108,15 @@ class TemplateProvider(DNSProvider):
         #     "content": value,
         #     "ttl": ttl,
         # }
-        # response = requests.post(
-        #     f"{self.api_base}/domains/{domain}/records",
-        #     headers=self.headers,
-        #     json=data,
-        #     timeout=30
+        # response = self._request(
+        #     "POST",
+        #     self._records_url.format(domain=domain),
+        #     data=_json.dumps(data),  # Content-Type is a session header
         # )
         # response.raise_for_status()
-        # return response.json()["record"]
+        # self.invalidate_records(domain)
+        # rec = _json.loads(response.content)["record"]
+        # return DNSRecord(rec["id"], rec["name"], rec["type"], rec["content"])
 
         raise NotImplementedError("Implement create_txt_record()")
 
@@ -112,11 +128,11 @@ class TemplateProvider(DNSProvider):
             bool: True if deleted successfully
         """
         # Example implementation:
-        # response = requests.delete(
-        #     f"{self.api_base}/domains/{domain}/records/{record_id}",
-        #     headers=self.headers,
-        #     timeout=30
+        # response = self._request(
+        #     "DELETE",
+        #     self._record_url.format(domain=domain, rid=record_id),
         # )
+        # self.invalidate_records(domain)
         # return response.status_code in (200, 204)
 
         raise NotImplementedError("Implement delete_txt_record()")